@@ -243,6 +243,13 @@ class CeleryConfig(DatabaseConfig):
         default=0.1,
     )
 
+    CELERY_WORKER_PREFETCH_MULTIPLIER: PositiveInt = Field(
+        description="Number of messages each Celery worker process reserves ahead of time."
+        " Set to 1 on workers consuming the dataset queue, whose indexing tasks are long-running"
+        " and acknowledged late.",
+        default=4,
+    )
+
     @computed_field
     def CELERY_RESULT_BACKEND(self) -> str | None:
         if self.CELERY_BACKEND in ("database", "rabbitmq"):
@@ -513,11 +513,7 @@ class BaseAgentRunner(AppRunner):
             return UserPromptMessage(content=message.query)
         prompt_message_contents: list[PromptMessageContentUnionTypes] = []
         prompt_message_contents.append(TextPromptMessageContent(data=message.query))
-        for file in file_objs:
-            prompt_message_contents.append(
-                file_manager.to_prompt_message_content(
-                    file,
-                    image_detail_config=image_detail_config,
-                )
-            )
+        prompt_message_contents.extend(
+            file_manager.to_prompt_message_contents(file_objs, image_detail_config=image_detail_config)
+        )
         return UserPromptMessage(content=prompt_message_contents)
@@ -52,13 +52,9 @@ class CotChatAgentRunner(CotAgentRunner):
                 else None
             )
             image_detail_config = image_detail_config or ImagePromptMessageContent.DETAIL.LOW
-            for file in self.files:
-                prompt_message_contents.append(
-                    file_manager.to_prompt_message_content(
-                        file,
-                        image_detail_config=image_detail_config,
-                    )
-                )
+            prompt_message_contents.extend(
+                file_manager.to_prompt_message_contents(self.files, image_detail_config=image_detail_config)
+            )
 
             prompt_messages.append(UserPromptMessage(content=prompt_message_contents))
         else:
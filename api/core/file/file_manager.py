@@ -1,5 +1,8 @@
-import base64
-from collections.abc import Mapping
+import binascii
+import time
+from collections.abc import Callable, Generator, Hashable, Iterable, Mapping, Sequence
+from operator import attrgetter
+from typing import Any, Generic, Literal, TypeVar, overload
 
 from configs import dify_config
 from core.helper import ssrf_proxy
@@ -11,32 +14,45 @@ from core.model_runtime.entities import (
     VideoPromptMessageContent,
 )
 from core.model_runtime.entities.message_entities import PromptMessageContentUnionTypes
-from core.tools.signature import sign_tool_file
+from core.tools.signature import sign_tool_files
 from extensions.ext_storage import storage
 
 from . import helpers
 from .enums import FileAttribute
 from .models import File, FileTransferMethod, FileType
 
+# Multiple of 3, so base64-encoding each chunk separately never emits padding mid-stream.
+_BASE64_CHUNK_SIZE = 57 * 4096
+
+# Signed URLs are reused within a time bucket, so a cached URL is at most this many seconds older than a fresh one.
+# The bucket is shortened to half of FILES_ACCESS_TIMEOUT, see `_signed_url_cache_ttl`.
+_SIGNED_URL_CACHE_MAX_TTL = 60
+_SIGNED_URL_CACHE_MAXSIZE = 4096
+
+_K = TypeVar("_K", bound=Hashable)
+
+_PROMPT_CLASS_MAP: Mapping[FileType, type[PromptMessageContentUnionTypes]] = {
+    FileType.IMAGE: ImagePromptMessageContent,
+    FileType.AUDIO: AudioPromptMessageContent,
+    FileType.VIDEO: VideoPromptMessageContent,
+    FileType.DOCUMENT: DocumentPromptMessageContent,
+}
+
+_ATTR_GETTERS: Mapping[FileAttribute, Callable[[File], Any]] = {
+    FileAttribute.TYPE: lambda f: f.type.value,
+    FileAttribute.SIZE: attrgetter("size"),
+    FileAttribute.NAME: attrgetter("filename"),
+    FileAttribute.MIME_TYPE: attrgetter("mime_type"),
+    FileAttribute.TRANSFER_METHOD: lambda f: f.transfer_method.value,
+    # resolved at call time, _to_url is defined further down
+    FileAttribute.URL: lambda f: _to_url(f),
+    FileAttribute.EXTENSION: attrgetter("extension"),
+    FileAttribute.RELATED_ID: attrgetter("related_id"),
+}
+
 
 def get_attr(*, file: File, attr: FileAttribute):
-    match attr:
-        case FileAttribute.TYPE:
-            return file.type.value
-        case FileAttribute.SIZE:
-            return file.size
-        case FileAttribute.NAME:
-            return file.filename
-        case FileAttribute.MIME_TYPE:
-            return file.mime_type
-        case FileAttribute.TRANSFER_METHOD:
-            return file.transfer_method.value
-        case FileAttribute.URL:
-            return _to_url(file)
-        case FileAttribute.EXTENSION:
-            return file.extension
-        case FileAttribute.RELATED_ID:
-            return file.related_id
+    return _ATTR_GETTERS[attr](file)
 
 
 def to_prompt_message_content(
@@ -65,80 +81,157 @@ def to_prompt_message_content(
     Raises:
         ValueError: If file extension or mime_type is missing
     """
+    return _to_prompt_message_content(f, image_detail_config=image_detail_config)
+
+
+def to_prompt_message_contents(
+    files: Sequence[File],
+    /,
+    *,
+    image_detail_config: ImagePromptMessageContent.DETAIL | None = None,
+) -> list[PromptMessageContentUnionTypes]:
+    """
+    Convert several files to prompt message contents, see `to_prompt_message_content`.
+
+    When files are sent as URLs, the URLs of all supported files are signed in one batch up front.
+    """
+    if dify_config.MULTIMODAL_SEND_FORMAT == "base64":
+        return [_to_prompt_message_content(f, image_detail_config=image_detail_config) for f in files]
+
+    supported_files = [f for f in files if f.type in _PROMPT_CLASS_MAP]
+    urls = dict(zip(map(id, supported_files), _to_urls_batch(supported_files)))
+    return [_to_prompt_message_content(f, image_detail_config=image_detail_config, url=urls.get(id(f))) for f in files]
+
+
+def _to_prompt_message_content(
+    f: File,
+    /,
+    *,
+    image_detail_config: ImagePromptMessageContent.DETAIL | None,
+    url: str | None = None,
+) -> PromptMessageContentUnionTypes:
     if f.extension is None:
         raise ValueError("Missing file extension")
     if f.mime_type is None:
         raise ValueError("Missing file mime_type")
 
-    prompt_class_map: Mapping[FileType, type[PromptMessageContentUnionTypes]] = {
-        FileType.IMAGE: ImagePromptMessageContent,
-        FileType.AUDIO: AudioPromptMessageContent,
-        FileType.VIDEO: VideoPromptMessageContent,
-        FileType.DOCUMENT: DocumentPromptMessageContent,
-    }
-
     # Check if file type is supported
-    if f.type not in prompt_class_map:
+    prompt_class = _PROMPT_CLASS_MAP.get(f.type)
+    if prompt_class is None:
         # For unsupported file types, return a text description
         return TextPromptMessageContent(data=f"[Unsupported file type: {f.filename} ({f.type.value})]")
 
     # Process supported file types
     params = {
-        "base64_data": _get_encoded_string(f) if dify_config.MULTIMODAL_SEND_FORMAT == "base64" else "",
-        "url": _to_url(f) if dify_config.MULTIMODAL_SEND_FORMAT == "url" else "",
         "format": f.extension.removeprefix("."),
         "mime_type": f.mime_type,
     }
+    # Only compute the representation that will be sent; the other field keeps its default
+    if dify_config.MULTIMODAL_SEND_FORMAT == "base64":
+        params["base64_data"] = _get_encoded_string(f)
+    else:
+        params["url"] = url if url is not None else _to_url(f)
     if f.type == FileType.IMAGE:
         params["detail"] = image_detail_config or ImagePromptMessageContent.DETAIL.LOW
 
-    return prompt_class_map[f.type].model_validate(params)
+    return prompt_class.model_validate(params)
 
 
-def download(f: File, /):
+def download(f: File, /) -> bytes:
+    """
+    Download the whole content of a file.
+
+    Consumers that only process the bytes incrementally (hashing, base64 encoding, re-uploading)
+    should prefer `download_iter`, which never holds the full content in memory.
+    """
     if f.transfer_method in (FileTransferMethod.TOOL_FILE, FileTransferMethod.LOCAL_FILE):
+        # storage returns the object in a single read, which is cheaper than joining streamed chunks
         return _download_file_content(f._storage_key)
-    elif f.transfer_method == FileTransferMethod.REMOTE_URL:
-        response = ssrf_proxy.get(f.remote_url, follow_redirects=True)
-        response.raise_for_status()
-        return response.content
-    raise ValueError(f"unsupported transfer method: {f.transfer_method}")
+    return b"".join(download_iter(f))
 
 
-def _download_file_content(path: str, /):
+def download_iter(f: File, /, *, chunk_size: int = 1 << 20) -> Generator[bytes, None, None]:
     """
-    Download and return the contents of a file as bytes.
+    Download the content of a file as a stream of bytes chunks.
+
+    Args:
+        f: The file to download
+        chunk_size: The chunk size for remote files; local and tool files are chunked by the storage backend
+
+    Raises:
+        ValueError: If the transfer method is not supported
+    """
+    if f.transfer_method in (FileTransferMethod.TOOL_FILE, FileTransferMethod.LOCAL_FILE):
+        yield from _download_file_content(f._storage_key, stream=True)
+    elif f.transfer_method == FileTransferMethod.REMOTE_URL:
+        with ssrf_proxy.stream("GET", f.remote_url, follow_redirects=True) as response:
+            response.raise_for_status()
+            yield from response.iter_bytes(chunk_size)
+    else:
+        raise ValueError(f"unsupported transfer method: {f.transfer_method}")
 
-    This function loads the file from storage and ensures it's in bytes format.
+
+@overload
+def _download_file_content(path: str, /, *, stream: Literal[False] = False) -> bytes: ...
+
+
+@overload
+def _download_file_content(path: str, /, *, stream: Literal[True]) -> Generator[bytes, None, None]: ...
+
+
+def _download_file_content(path: str, /, *, stream: bool = False) -> bytes | Generator[bytes, None, None]:
+    """
+    Download the contents of a file from storage.
 
     Args:
         path (str): The path to the file in storage.
+        stream (bool): If True, return a generator yielding the file in chunks instead of the whole content.
 
     Returns:
-        bytes: The contents of the file as a bytes object.
+        bytes | Generator: The contents of the file as a bytes object, or a generator of bytes chunks.
 
     Raises:
         ValueError: If the loaded file is not a bytes object.
     """
+    if stream:
+        return storage.load(path, stream=True)
     data = storage.load(path, stream=False)
     if not isinstance(data, bytes):
         raise ValueError(f"file {path} is not a bytes object")
     return data
 
 
-def _get_encoded_string(f: File, /):
-    match f.transfer_method:
-        case FileTransferMethod.REMOTE_URL:
-            response = ssrf_proxy.get(f.remote_url, follow_redirects=True)
-            response.raise_for_status()
-            data = response.content
-        case FileTransferMethod.LOCAL_FILE:
-            data = _download_file_content(f._storage_key)
-        case FileTransferMethod.TOOL_FILE:
-            data = _download_file_content(f._storage_key)
+def _b64encode_chunks(chunks: Iterable[bytes], /) -> str:
+    """
+    Base64-encode a stream of bytes chunks without materializing the raw content.
+
+    Chunks are re-aligned to multiples of 3 bytes so that the concatenated output is identical to
+    encoding the whole content at once.
+    """
+    encoded = bytearray()
+    pending = b""
+    for chunk in chunks:
+        # encode straight from a view of the chunk, b2a_base64 accepts any buffer so no slice is copied
+        view = memoryview(chunk)
+        if pending:
+            # complete the group left over from the previous chunk instead of prepending it to the whole chunk
+            missing = 3 - len(pending)
+            pending += bytes(view[:missing])
+            view = view[missing:]
+            if len(pending) < 3:
+                continue
+            encoded += binascii.b2a_base64(pending, newline=False)
+        aligned = len(view) - len(view) % 3
+        for start in range(0, aligned, _BASE64_CHUNK_SIZE):
+            encoded += binascii.b2a_base64(view[start : min(start + _BASE64_CHUNK_SIZE, aligned)], newline=False)
+        pending = bytes(view[aligned:])
+    if pending:
+        encoded += binascii.b2a_base64(pending, newline=False)
+    return encoded.decode("ascii")
 
-    encoded_string = base64.b64encode(data).decode("utf-8")
-    return encoded_string
+
+def _get_encoded_string(f: File, /):
+    return _b64encode_chunks(download_iter(f, chunk_size=_BASE64_CHUNK_SIZE))
 
 
 def _to_url(f: File, /):
@@ -149,11 +242,101 @@ def _to_url(f: File, /):
     elif f.transfer_method == FileTransferMethod.LOCAL_FILE:
         if f.related_id is None:
             raise ValueError("Missing file related_id")
-        return f.remote_url or helpers.get_signed_file_url(upload_file_id=f.related_id)
+        return f.remote_url or _signed_upload_file_urls([f.related_id])[0]
     elif f.transfer_method == FileTransferMethod.TOOL_FILE:
         # add sign url
         if f.related_id is None or f.extension is None:
             raise ValueError("Missing file related_id or extension")
-        return sign_tool_file(tool_file_id=f.related_id, extension=f.extension)
+        return _signed_tool_file_urls([(f.related_id, f.extension)])[0]
     else:
         raise ValueError(f"Unsupported transfer method: {f.transfer_method}")
+
+
+def _to_urls_batch(files: Sequence[File], /) -> list[str]:
+    """
+    Resolve the URLs of several files, signing the upload file URLs and the tool file URLs that are not cached yet
+    in one batch each. URLs are returned in input order.
+    """
+    urls: list[str] = [""] * len(files)
+    upload_file_indexes: list[int] = []
+    upload_file_ids: list[str] = []
+    tool_file_indexes: list[int] = []
+    tool_files: list[tuple[str, str]] = []
+    for index, f in enumerate(files):
+        if f.transfer_method == FileTransferMethod.LOCAL_FILE and not f.remote_url and f.related_id is not None:
+            upload_file_indexes.append(index)
+            upload_file_ids.append(f.related_id)
+        elif f.transfer_method == FileTransferMethod.TOOL_FILE and f.related_id is not None and f.extension is not None:
+            tool_file_indexes.append(index)
+            tool_files.append((f.related_id, f.extension))
+        else:
+            # nothing to sign, or invalid; _to_url returns the URL as is or raises the usual error
+            urls[index] = _to_url(f)
+
+    if upload_file_ids:
+        for index, url in zip(upload_file_indexes, _signed_upload_file_urls(upload_file_ids)):
+            urls[index] = url
+    if tool_files:
+        for index, url in zip(tool_file_indexes, _signed_tool_file_urls(tool_files)):
+            urls[index] = url
+    return urls
+
+
+def _signed_url_cache_ttl() -> int:
+    # a cached URL keeps at least half of its validity when it reaches the model provider
+    return min(_SIGNED_URL_CACHE_MAX_TTL, dify_config.FILES_ACCESS_TIMEOUT // 2)
+
+
+def _signed_url_time_bucket(ttl: int, /) -> int:
+    return int(time.time() // ttl)
+
+
+class _SignedURLCache(Generic[_K]):
+    """
+    Signed URLs of the current time bucket, all entries are dropped when the bucket rolls over.
+    """
+
+    def __init__(self, maxsize: int):
+        self._maxsize = maxsize
+        self._time_bucket: int | None = None
+        self._urls: dict[_K, str] = {}
+
+    def get_many(self, keys: Sequence[_K], sign: Callable[[list[_K]], list[str]], /) -> list[str]:
+        """
+        Return the URLs of `keys` in order, calling `sign` once with the keys that are not cached yet.
+        """
+        ttl = _signed_url_cache_ttl()
+        if ttl <= 0:
+            # URLs expire too quickly to be reused at all
+            return sign(list(keys))
+        time_bucket = _signed_url_time_bucket(ttl)
+        if time_bucket != self._time_bucket:
+            self._urls = {}
+            self._time_bucket = time_bucket
+        # the dict is replaced rather than cleared, so this snapshot stays valid if another thread resets the cache
+        urls = self._urls
+        missing = list(dict.fromkeys(key for key in keys if key not in urls))
+        if not missing:
+            return [urls[key] for key in keys]
+
+        signed = dict(zip(missing, sign(missing)))
+        if len(urls) + len(signed) > self._maxsize:
+            self._urls = {}
+        self._urls.update(signed)
+        return [signed[key] if key in signed else urls[key] for key in keys]
+
+    def clear(self) -> None:
+        self._urls = {}
+        self._time_bucket = None
+
+
+_upload_file_url_cache: _SignedURLCache[str] = _SignedURLCache(_SIGNED_URL_CACHE_MAXSIZE)
+_tool_file_url_cache: _SignedURLCache[tuple[str, str]] = _SignedURLCache(_SIGNED_URL_CACHE_MAXSIZE)
+
+
+def _signed_upload_file_urls(upload_file_ids: Sequence[str], /) -> list[str]:
+    return _upload_file_url_cache.get_many(upload_file_ids, helpers.get_signed_file_urls)
+
+
+def _signed_tool_file_urls(tool_files: Sequence[tuple[str, str]], /) -> list[str]:
+    return _tool_file_url_cache.get_many(tool_files, sign_tool_files)
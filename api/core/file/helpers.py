@@ -3,21 +3,34 @@ import hashlib
 import hmac
 import os
 import time
+from collections.abc import Sequence
 
 from configs import dify_config
 
 
 def get_signed_file_url(upload_file_id: str) -> str:
-    url = f"{dify_config.FILES_URL}/files/{upload_file_id}/file-preview"
+    return get_signed_file_urls([upload_file_id])[0]
 
-    timestamp = str(int(time.time()))
-    nonce = os.urandom(16).hex()
-    key = dify_config.SECRET_KEY.encode()
-    msg = f"file-preview|{upload_file_id}|{timestamp}|{nonce}"
-    sign = hmac.new(key, msg.encode(), hashlib.sha256).digest()
-    encoded_sign = base64.urlsafe_b64encode(sign).decode()
 
-    return f"{url}?timestamp={timestamp}&nonce={nonce}&sign={encoded_sign}"
+def get_signed_file_urls(upload_file_ids: Sequence[str]) -> list[str]:
+    """
+    Sign the preview URLs of several upload files, the HMAC key setup is done once and copied for every file.
+    """
+    url_prefix = f"{dify_config.FILES_URL}/files"
+
+    timestamp = str(int(time.time()))
+    signer = hmac.new(dify_config.SECRET_KEY.encode(), digestmod=hashlib.sha256)
+    signed_urls = []
+    for upload_file_id in upload_file_ids:
+        nonce = os.urandom(16).hex()
+        file_signer = signer.copy()
+        file_signer.update(f"file-preview|{upload_file_id}|{timestamp}|{nonce}".encode())
+        encoded_sign = base64.urlsafe_b64encode(file_signer.digest()).decode()
+        signed_urls.append(
+            f"{url_prefix}/{upload_file_id}/file-preview?timestamp={timestamp}&nonce={nonce}&sign={encoded_sign}"
+        )
+
+    return signed_urls
 
 
 def get_signed_file_url_for_plugin(filename: str, mimetype: str, tenant_id: str, user_id: str) -> str:
@@ -4,6 +4,8 @@ Proxy requests to avoid SSRF
 
 import logging
 import time
+from collections.abc import Iterator
+from contextlib import ExitStack, contextmanager
 
 import httpx
 
@@ -34,7 +36,10 @@ class MaxRetriesExceededError(ValueError):
     pass
 
 
-def make_request(method, url, max_retries=SSRF_DEFAULT_MAX_RETRIES, **kwargs):
+def _prepare_request_kwargs(kwargs: dict) -> bool:
+    """
+    Normalize request kwargs in place and return the SSL verify flag to use for the client.
+    """
     if "allow_redirects" in kwargs:
         allow_redirects = kwargs.pop("allow_redirects")
         if "follow_redirects" not in kwargs:
@@ -51,24 +56,30 @@ def make_request(method, url, max_retries=SSRF_DEFAULT_MAX_RETRIES, **kwargs):
     if "ssl_verify" not in kwargs:
         kwargs["ssl_verify"] = HTTP_REQUEST_NODE_SSL_VERIFY
 
-    ssl_verify = kwargs.pop("ssl_verify")
+    return kwargs.pop("ssl_verify")
+
+
+def _create_client(ssl_verify: bool) -> httpx.Client:
+    if dify_config.SSRF_PROXY_ALL_URL:
+        return httpx.Client(proxy=dify_config.SSRF_PROXY_ALL_URL, verify=ssl_verify)
+    elif dify_config.SSRF_PROXY_HTTP_URL and dify_config.SSRF_PROXY_HTTPS_URL:
+        proxy_mounts = {
+            "http://": httpx.HTTPTransport(proxy=dify_config.SSRF_PROXY_HTTP_URL, verify=ssl_verify),
+            "https://": httpx.HTTPTransport(proxy=dify_config.SSRF_PROXY_HTTPS_URL, verify=ssl_verify),
+        }
+        return httpx.Client(mounts=proxy_mounts, verify=ssl_verify)
+    else:
+        return httpx.Client(verify=ssl_verify)
+
+
+def make_request(method, url, max_retries=SSRF_DEFAULT_MAX_RETRIES, **kwargs):
+    ssl_verify = _prepare_request_kwargs(kwargs)
 
     retries = 0
     while retries <= max_retries:
         try:
-            if dify_config.SSRF_PROXY_ALL_URL:
-                with httpx.Client(proxy=dify_config.SSRF_PROXY_ALL_URL, verify=ssl_verify) as client:
-                    response = client.request(method=method, url=url, **kwargs)
-            elif dify_config.SSRF_PROXY_HTTP_URL and dify_config.SSRF_PROXY_HTTPS_URL:
-                proxy_mounts = {
-                    "http://": httpx.HTTPTransport(proxy=dify_config.SSRF_PROXY_HTTP_URL, verify=ssl_verify),
-                    "https://": httpx.HTTPTransport(proxy=dify_config.SSRF_PROXY_HTTPS_URL, verify=ssl_verify),
-                }
-                with httpx.Client(mounts=proxy_mounts, verify=ssl_verify) as client:
-                    response = client.request(method=method, url=url, **kwargs)
-            else:
-                with httpx.Client(verify=ssl_verify) as client:
-                    response = client.request(method=method, url=url, **kwargs)
+            with _create_client(ssl_verify) as client:
+                response = client.request(method=method, url=url, **kwargs)
 
             if response.status_code not in STATUS_FORCELIST:
                 return response
@@ -88,6 +99,40 @@ def make_request(method, url, max_retries=SSRF_DEFAULT_MAX_RETRIES, **kwargs):
     raise MaxRetriesExceededError(f"Reached maximum retries ({max_retries}) for URL {url}")
 
 
+@contextmanager
+def stream(method, url, max_retries=SSRF_DEFAULT_MAX_RETRIES, **kwargs) -> Iterator[httpx.Response]:
+    """
+    Like `make_request`, but yields a response whose body has not been read yet,
+    so callers can consume it incrementally with `iter_bytes()`.
+
+    Retries only cover establishing the response; errors raised while reading the body propagate.
+    """
+    ssl_verify = _prepare_request_kwargs(kwargs)
+
+    retries = 0
+    while retries <= max_retries:
+        with ExitStack() as stack:
+            try:
+                client = stack.enter_context(_create_client(ssl_verify))
+                response = stack.enter_context(client.stream(method=method, url=url, **kwargs))
+            except httpx.RequestError as e:
+                logging.warning("Request to URL %s failed on attempt %s: %s", url, retries + 1, e)
+                if max_retries == 0:
+                    raise
+            else:
+                if response.status_code not in STATUS_FORCELIST:
+                    yield response
+                    return
+                logging.warning(
+                    "Received status code %s for URL %s which is in the force list", response.status_code, url
+                )
+
+        retries += 1
+        if retries <= max_retries:
+            time.sleep(BACKOFF_FACTOR * (2 ** (retries - 1)))
+    raise MaxRetriesExceededError(f"Reached maximum retries ({max_retries}) for URL {url}")
+
+
 def get(url, max_retries=SSRF_DEFAULT_MAX_RETRIES, **kwargs):
     return make_request("GET", url, max_retries=max_retries, **kwargs)
 
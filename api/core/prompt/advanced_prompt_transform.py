@@ -126,10 +126,9 @@ class AdvancedPromptTransform(PromptTransform):
         if files:
             prompt_message_contents: list[PromptMessageContentUnionTypes] = []
             prompt_message_contents.append(TextPromptMessageContent(data=prompt))
-            for file in files:
-                prompt_message_contents.append(
-                    file_manager.to_prompt_message_content(file, image_detail_config=image_detail_config)
-                )
+            prompt_message_contents.extend(
+                file_manager.to_prompt_message_contents(files, image_detail_config=image_detail_config)
+            )
 
             prompt_messages.append(UserPromptMessage(content=prompt_message_contents))
         else:
@@ -202,10 +201,9 @@ class AdvancedPromptTransform(PromptTransform):
             if files and query is not None:
                 prompt_message_contents: list[PromptMessageContentUnionTypes] = []
                 prompt_message_contents.append(TextPromptMessageContent(data=query))
-                for file in files:
-                    prompt_message_contents.append(
-                        file_manager.to_prompt_message_content(file, image_detail_config=image_detail_config)
-                    )
+                prompt_message_contents.extend(
+                    file_manager.to_prompt_message_contents(files, image_detail_config=image_detail_config)
+                )
                 prompt_messages.append(UserPromptMessage(content=prompt_message_contents))
             else:
                 prompt_messages.append(UserPromptMessage(content=query))
@@ -216,26 +214,23 @@ class AdvancedPromptTransform(PromptTransform):
                 if last_message and last_message.role == PromptMessageRole.USER:
                     # get last user message content and add files
                     prompt_message_contents = [TextPromptMessageContent(data=cast(str, last_message.content))]
-                    for file in files:
-                        prompt_message_contents.append(
-                            file_manager.to_prompt_message_content(file, image_detail_config=image_detail_config)
-                        )
+                    prompt_message_contents.extend(
+                        file_manager.to_prompt_message_contents(files, image_detail_config=image_detail_config)
+                    )
 
                     last_message.content = prompt_message_contents
                 else:
                     prompt_message_contents = [TextPromptMessageContent(data="")]  # not for query
-                    for file in files:
-                        prompt_message_contents.append(
-                            file_manager.to_prompt_message_content(file, image_detail_config=image_detail_config)
-                        )
+                    prompt_message_contents.extend(
+                        file_manager.to_prompt_message_contents(files, image_detail_config=image_detail_config)
+                    )
 
                     prompt_messages.append(UserPromptMessage(content=prompt_message_contents))
             else:
                 prompt_message_contents = [TextPromptMessageContent(data=query)]
-                for file in files:
-                    prompt_message_contents.append(
-                        file_manager.to_prompt_message_content(file, image_detail_config=image_detail_config)
-                    )
+                prompt_message_contents.extend(
+                    file_manager.to_prompt_message_contents(files, image_detail_config=image_detail_config)
+                )
 
                 prompt_messages.append(UserPromptMessage(content=prompt_message_contents))
         elif query:
@@ -266,10 +266,9 @@ class SimplePromptTransform(PromptTransform):
         if files:
             prompt_message_contents: list[PromptMessageContentUnionTypes] = []
             prompt_message_contents.append(TextPromptMessageContent(data=prompt))
-            for file in files:
-                prompt_message_contents.append(
-                    file_manager.to_prompt_message_content(file, image_detail_config=image_detail_config)
-                )
+            prompt_message_contents.extend(
+                file_manager.to_prompt_message_contents(files, image_detail_config=image_detail_config)
+            )
 
             prompt_message = UserPromptMessage(content=prompt_message_contents)
         else:
@@ -3,6 +3,7 @@ import hashlib
 import hmac
 import os
 import time
+from collections.abc import Sequence
 
 from configs import dify_config
 
@@ -11,18 +12,31 @@ def sign_tool_file(tool_file_id: str, extension: str) -> str:
     """
     sign file to get a temporary url for plugin access
     """
+    return sign_tool_files([(tool_file_id, extension)])[0]
+
+
+def sign_tool_files(tool_files: Sequence[tuple[str, str]]) -> list[str]:
+    """
+    sign several (tool_file_id, extension) pairs,
+    the HMAC key setup is done once and copied for every file
+    """
     # Use internal URL for plugin/tool file access in Docker environments
     base_url = dify_config.INTERNAL_FILES_URL or dify_config.FILES_URL
-    file_preview_url = f"{base_url}/files/tools/{tool_file_id}{extension}"
 
     timestamp = str(int(time.time()))
-    nonce = os.urandom(16).hex()
-    data_to_sign = f"file-preview|{tool_file_id}|{timestamp}|{nonce}"
     secret_key = dify_config.SECRET_KEY.encode() if dify_config.SECRET_KEY else b""
-    sign = hmac.new(secret_key, data_to_sign.encode(), hashlib.sha256).digest()
-    encoded_sign = base64.urlsafe_b64encode(sign).decode()
-
-    return f"{file_preview_url}?timestamp={timestamp}&nonce={nonce}&sign={encoded_sign}"
+    signer = hmac.new(secret_key, digestmod=hashlib.sha256)
+    signed_urls = []
+    for tool_file_id, extension in tool_files:
+        nonce = os.urandom(16).hex()
+        file_signer = signer.copy()
+        file_signer.update(f"file-preview|{tool_file_id}|{timestamp}|{nonce}".encode())
+        encoded_sign = base64.urlsafe_b64encode(file_signer.digest()).decode()
+        signed_urls.append(
+            f"{base_url}/files/tools/{tool_file_id}{extension}?timestamp={timestamp}&nonce={nonce}&sign={encoded_sign}"
+        )
+
+    return signed_urls
 
 
 def verify_tool_file_signature(file_id: str, timestamp: str, nonce: str, sign: str) -> bool:
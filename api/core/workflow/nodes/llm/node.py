@@ -726,10 +726,7 @@ class LLMNode(BaseNode):
 
         # The sys_files will be deprecated later
         if vision_enabled and sys_files:
-            file_prompts = []
-            for file in sys_files:
-                file_prompt = file_manager.to_prompt_message_content(file, image_detail_config=vision_detail)
-                file_prompts.append(file_prompt)
+            file_prompts = file_manager.to_prompt_message_contents(sys_files, image_detail_config=vision_detail)
             # If last prompt is a user prompt, add files into its contents,
             # otherwise append a new user prompt
             if (
@@ -926,22 +923,17 @@ class LLMNode(BaseNode):
                 segment_group = variable_pool.convert_template(template)
 
                 # Process segments for images
-                file_contents = []
+                files: list[File] = []
                 for segment in segment_group.value:
                     if isinstance(segment, ArrayFileSegment):
                         for file in segment.value:
                             if file.type in {FileType.IMAGE, FileType.VIDEO, FileType.AUDIO, FileType.DOCUMENT}:
-                                file_content = file_manager.to_prompt_message_content(
-                                    file, image_detail_config=vision_detail_config
-                                )
-                                file_contents.append(file_content)
+                                files.append(file)
                     elif isinstance(segment, FileSegment):
                         file = segment.value
                         if file.type in {FileType.IMAGE, FileType.VIDEO, FileType.AUDIO, FileType.DOCUMENT}:
-                            file_content = file_manager.to_prompt_message_content(
-                                file, image_detail_config=vision_detail_config
-                            )
-                            file_contents.append(file_content)
+                            files.append(file)
+                file_contents = file_manager.to_prompt_message_contents(files, image_detail_config=vision_detail_config)
 
                 # Create message with text from all segments
                 plain_text = segment_group.text
@@ -48,6 +48,7 @@ def init_app(app: DifyApp) -> Celery:
         worker_log_format=dify_config.LOG_FORMAT,
         worker_task_log_format=dify_config.LOG_FORMAT,
         worker_hijack_root_logger=False,
+        worker_prefetch_multiplier=dify_config.CELERY_WORKER_PREFETCH_MULTIPLIER,
         timezone=pytz.timezone(dify_config.LOG_TZ or "UTC"),
     )
 
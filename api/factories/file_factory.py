@@ -9,7 +9,7 @@ import httpx
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from constants import AUDIO_EXTENSIONS, DOCUMENT_EXTENSIONS, IMAGE_EXTENSIONS, VIDEO_EXTENSIONS
+from constants import AUDIO_EXTENSIONS, DOCUMENT_EXTENSIONS, IMAGE_EXTENSIONS, VIDEO_EXTENSIONS, has_extension
 from core.file import File, FileBelongsTo, FileTransferMethod, FileType, FileUploadConfig, helpers
 from core.helper import ssrf_proxy
 from extensions.ext_database import db
@@ -351,14 +351,13 @@ def _standardize_file_type(*, extension: str = "", mime_type: str = "") -> FileT
 
 
 def _get_file_type_by_extension(extension: str) -> FileType | None:
-    extension = extension.lstrip(".")
-    if extension in IMAGE_EXTENSIONS:
+    if has_extension(extension, IMAGE_EXTENSIONS):
         return FileType.IMAGE
-    elif extension in VIDEO_EXTENSIONS:
+    elif has_extension(extension, VIDEO_EXTENSIONS):
         return FileType.VIDEO
-    elif extension in AUDIO_EXTENSIONS:
+    elif has_extension(extension, AUDIO_EXTENSIONS):
         return FileType.AUDIO
-    elif extension in DOCUMENT_EXTENSIONS:
+    elif has_extension(extension, DOCUMENT_EXTENSIONS):
         return FileType.DOCUMENT
     return None
 
@@ -49,7 +49,7 @@ class AudioService:
             raise NoAudioUploadedServiceError()
 
         extension = file.mimetype
-        if extension not in [f"audio/{ext}" for ext in AUDIO_EXTENSIONS]:
+        if not extension.startswith("audio/") or extension.removeprefix("audio/").lower() not in AUDIO_EXTENSIONS:
             raise UnsupportedAudioTypeServiceError()
 
         file_content = file.read()
@@ -98,6 +98,7 @@ class FileService:
 
     @staticmethod
     def is_file_size_within_limit(*, extension: str, file_size: int) -> bool:
+        extension = extension.lower()
         if extension in IMAGE_EXTENSIONS:
             file_size_limit = dify_config.UPLOAD_IMAGE_FILE_SIZE_LIMIT * 1024 * 1024
         elif extension in VIDEO_EXTENSIONS:
@@ -3,48 +3,108 @@ import logging
 import time
 from typing import Optional
 
-import click
 from celery import shared_task  # type: ignore
+from redis.exceptions import LockNotOwnedError
+from sqlalchemy import bindparam, update
 
+from core.rag.index_processor.index_processor_base import BaseIndexProcessor
 from core.rag.index_processor.index_processor_factory import IndexProcessorFactory
 from core.rag.models.document import Document
 from extensions.ext_database import db
 from extensions.ext_redis import redis_client
-from models.dataset import DocumentSegment
+from models.dataset import Dataset, DocumentSegment
+from models.dataset import Document as DatasetDocument
 
+logger = logging.getLogger(__name__)
 
-@shared_task(queue="dataset")
-def create_segment_to_index_task(segment_id: str, keywords: Optional[list[str]] = None):
+# keep pathological exception messages from bloating the segment row
+MAX_SEGMENT_ERROR_LENGTH = 2048
+
+# the indexing lock outlives a dead owner by at most this long; a redelivered task that finds the lock taken keeps
+# retrying for longer than that, so a crashed worker delays the segment instead of leaving it waiting forever
+INDEXING_LOCK_TIMEOUT = 600
+INDEXING_LOCK_RETRY_COUNTDOWN = 60
+
+# built once so every task reuses the same cached compiled statement; synchronize_session is disabled because
+# no DocumentSegment instance is loaded into the session
+_COMPLETE_SEGMENT_STMT = (
+    update(DocumentSegment)
+    .where(DocumentSegment.id == bindparam("segment_id"))
+    .values(status="completed", completed_at=bindparam("completed_at_value"))
+    .execution_options(synchronize_session=False)
+)
+
+# index processors are stateless, so each worker process keeps one per index type
+_INDEX_PROCESSOR_CACHE: dict[str | None, BaseIndexProcessor] = {}
+
+
+def get_index_processor(index_type: str | None) -> BaseIndexProcessor:
+    index_processor = _INDEX_PROCESSOR_CACHE.get(index_type)
+    if index_processor is None:
+        index_processor = IndexProcessorFactory(index_type).init_index_processor()
+        _INDEX_PROCESSOR_CACHE[index_type] = index_processor
+    return index_processor
+
+
+@shared_task(
+    queue="dataset",
+    bind=True,
+    acks_late=True,
+    reject_on_worker_lost=True,
+    max_retries=INDEXING_LOCK_TIMEOUT // INDEXING_LOCK_RETRY_COUNTDOWN + 1,
+)
+def create_segment_to_index_task(self, segment_id: str, keywords: Optional[list[str]] = None):
     """
     Async create segment to index
     :param segment_id:
     :param keywords:
     Usage: create_segment_to_index_task.delay(segment_id)
     """
-    logging.info(click.style(f"Start create segment to index: {segment_id}", fg="green"))
+    logger.info("Start create segment to index: %s", segment_id)
     start_at = time.perf_counter()
-
-    segment = db.session.query(DocumentSegment).where(DocumentSegment.id == segment_id).first()
-    if not segment:
-        logging.info(click.style(f"Segment not found: {segment_id}", fg="red"))
-        db.session.close()
-        return
-
-    if segment.status != "waiting":
-        db.session.close()
-        return
-
-    indexing_cache_key = f"segment_{segment.id}_indexing"
+    now = datetime.datetime.now(datetime.UTC).replace(tzinfo=None)
+
+    indexing_cache_key = f"segment_{segment_id}_indexing"
+    # hold the indexing key for the whole run so duplicate deliveries of this task do not index concurrently;
+    # the lock value is a per-owner token and release only deletes the key if we still own it
+    indexing_lock = redis_client.lock(indexing_cache_key, timeout=INDEXING_LOCK_TIMEOUT)
+    if not indexing_lock.acquire(blocking=False):
+        # the holder may be a worker that died mid-run, so check again once its lock can have expired rather than
+        # dropping the message; the claim below turns the retry into a no-op if the holder did finish the segment
+        logger.info("Segment is already being indexed, retry later: %s", segment_id)
+        raise self.retry(countdown=INDEXING_LOCK_RETRY_COUNTDOWN)
 
     try:
-        # update segment status to indexing
-        db.session.query(DocumentSegment).filter_by(id=segment.id).update(
-            {
-                DocumentSegment.status: "indexing",
-                DocumentSegment.indexing_at: datetime.datetime.now(datetime.UTC).replace(tzinfo=None),
-            }
-        )
+        # claim the segment and mark it as indexing in a single round trip; the status predicate makes the
+        # check-and-set atomic, so two workers can never both pick up the same waiting segment, and the
+        # document predicates skip segments whose document is disabled, archived or still being indexed
+        segment = db.session.execute(
+            update(DocumentSegment)
+            .where(
+                DocumentSegment.id == segment_id,
+                DocumentSegment.status == "waiting",
+                DatasetDocument.id == DocumentSegment.document_id,
+                DatasetDocument.enabled == True,
+                DatasetDocument.archived == False,
+                DatasetDocument.indexing_status == "completed",
+            )
+            .values(status="indexing", indexing_at=now)
+            .returning(
+                DocumentSegment.dataset_id,
+                DocumentSegment.document_id,
+                DocumentSegment.content,
+                DocumentSegment.index_node_id,
+                DocumentSegment.index_node_hash,
+            )
+            .execution_options(synchronize_session=False)
+        ).first()
+        if not segment:
+            logger.info("Segment %s not found, not waiting or its document status is invalid, pass.", segment_id)
+            return
+        # commit the claim before loading: index processors commit and roll back the shared session themselves
+        # (embedding cache, keyword table), and the segment row must not stay locked during the embedding call
         db.session.commit()
+
         document = Document(
             page_content=segment.content,
             metadata={
@@ -55,44 +115,41 @@ def create_segment_to_index_task(segment_id: str, keywords: Optional[list[str]]
             },
         )
 
-        dataset = segment.dataset
+        dataset = db.session.query(Dataset).where(Dataset.id == segment.dataset_id).first()
 
         if not dataset:
-            logging.info(click.style(f"Segment {segment.id} has no dataset, pass.", fg="cyan"))
-            return
-
-        dataset_document = segment.document
-
-        if not dataset_document:
-            logging.info(click.style(f"Segment {segment.id} has no document, pass.", fg="cyan"))
+            logger.info("Segment %s has no dataset, pass.", segment_id)
             return
 
-        if not dataset_document.enabled or dataset_document.archived or dataset_document.indexing_status != "completed":
-            logging.info(click.style(f"Segment {segment.id} document status is invalid, pass.", fg="cyan"))
-            return
-
-        index_type = dataset.doc_form
-        index_processor = IndexProcessorFactory(index_type).init_index_processor()
+        index_processor = get_index_processor(dataset.doc_form)
         index_processor.load(dataset, [document])
 
         # update segment to completed
-        db.session.query(DocumentSegment).filter_by(id=segment.id).update(
+        db.session.execute(
+            _COMPLETE_SEGMENT_STMT,
             {
-                DocumentSegment.status: "completed",
-                DocumentSegment.completed_at: datetime.datetime.now(datetime.UTC).replace(tzinfo=None),
-            }
+                "segment_id": segment_id,
+                "completed_at_value": datetime.datetime.now(datetime.UTC).replace(tzinfo=None),
+            },
         )
         db.session.commit()
 
         end_at = time.perf_counter()
-        logging.info(click.style(f"Segment created to index: {segment.id} latency: {end_at - start_at}", fg="green"))
+        logger.info("Segment %s indexed in %.3fs", segment_id, end_at - start_at)
     except Exception as e:
-        logging.exception("create segment to index failed")
-        segment.enabled = False
-        segment.disabled_at = datetime.datetime.now(datetime.UTC).replace(tzinfo=None)
-        segment.status = "error"
-        segment.error = str(e)
+        logger.exception("create segment to index failed")
+        # start over on a fresh transaction, the failed one may have been aborted by the database
+        db.session.rollback()
+        db.session.execute(
+            update(DocumentSegment)
+            .where(DocumentSegment.id == segment_id)
+            .values(enabled=False, disabled_at=now, status="error", error=str(e)[:MAX_SEGMENT_ERROR_LENGTH])
+            .execution_options(synchronize_session=False)
+        )
         db.session.commit()
     finally:
-        redis_client.delete(indexing_cache_key)
         db.session.close()
+        try:
+            indexing_lock.release()
+        except LockNotOwnedError:
+            logger.warning("Indexing lock of segment %s expired before the task finished", segment_id)
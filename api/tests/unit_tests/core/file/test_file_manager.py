@@ -0,0 +1,198 @@
+import base64
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from core.file import File, FileAttribute, FileTransferMethod, FileType, file_manager, helpers
+from core.tools import signature
+
+
+@pytest.fixture(autouse=True)
+def _clear_signed_url_cache():
+    file_manager._upload_file_url_cache.clear()
+    file_manager._tool_file_url_cache.clear()
+
+
+def _tool_file() -> File:
+    return File(
+        id="test-file",
+        tenant_id="test-tenant-id",
+        type=FileType.IMAGE,
+        transfer_method=FileTransferMethod.TOOL_FILE,
+        related_id="test-related-id",
+        filename="image.png",
+        extension=".png",
+        mime_type="image/png",
+        size=67,
+        storage_key="test-storage-key",
+    )
+
+
+@pytest.mark.parametrize(
+    ("attr", "expected"),
+    [
+        (FileAttribute.TYPE, "image"),
+        (FileAttribute.SIZE, 67),
+        (FileAttribute.NAME, "image.png"),
+        (FileAttribute.MIME_TYPE, "image/png"),
+        (FileAttribute.TRANSFER_METHOD, "tool_file"),
+        (FileAttribute.EXTENSION, ".png"),
+        (FileAttribute.RELATED_ID, "test-related-id"),
+    ],
+)
+def test_get_attr(attr, expected):
+    assert file_manager.get_attr(file=_tool_file(), attr=attr) == expected
+
+
+def test_get_attr_covers_all_attributes():
+    assert set(file_manager._ATTR_GETTERS) == set(FileAttribute)
+
+
+def test_to_url_reuses_signature_within_time_bucket():
+    f = _tool_file()
+    with (
+        patch.object(file_manager, "sign_tool_files", return_value=["https://example.com/signed"]) as mock_sign,
+        patch.object(file_manager, "_signed_url_time_bucket", return_value=1),
+    ):
+        assert file_manager._to_url(f) == "https://example.com/signed"
+        assert file_manager._to_url(f) == "https://example.com/signed"
+
+    mock_sign.assert_called_once_with([("test-related-id", ".png")])
+
+
+def test_to_url_re_signs_in_new_time_bucket():
+    f = _tool_file()
+    with (
+        patch.object(file_manager, "sign_tool_files", return_value=["https://example.com/signed"]) as mock_sign,
+        patch.object(file_manager, "_signed_url_time_bucket", side_effect=[1, 2]),
+    ):
+        file_manager._to_url(f)
+        file_manager._to_url(f)
+
+    assert mock_sign.call_count == 2
+
+
+@pytest.mark.parametrize(("files_access_timeout", "expected_ttl"), [(300, 60), (30, 15), (1, 0)])
+def test_signed_url_cache_ttl_follows_files_access_timeout(monkeypatch, files_access_timeout, expected_ttl):
+    monkeypatch.setattr(file_manager.dify_config, "FILES_ACCESS_TIMEOUT", files_access_timeout)
+
+    assert file_manager._signed_url_cache_ttl() == expected_ttl
+
+
+def test_to_url_bypasses_cache_with_small_files_access_timeout(monkeypatch):
+    monkeypatch.setattr(file_manager.dify_config, "FILES_ACCESS_TIMEOUT", 1)
+    f = _tool_file()
+    with patch.object(file_manager, "sign_tool_files", return_value=["https://example.com/signed"]) as mock_sign:
+        file_manager._to_url(f)
+        file_manager._to_url(f)
+
+    assert mock_sign.call_count == 2
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 4, 4096])
+def test_get_encoded_string_streams_local_file(chunk_size):
+    content = bytes(range(256)) * 41
+    chunks = [content[i : i + chunk_size] for i in range(0, len(content), chunk_size)]
+    f = _tool_file()
+    with patch.object(file_manager.storage, "load", return_value=iter(chunks)) as mock_load:
+        encoded = file_manager._get_encoded_string(f)
+
+    mock_load.assert_called_once_with("test-storage-key", stream=True)
+    assert encoded == base64.b64encode(content).decode("ascii")
+
+
+def test_download_iter_streams_remote_file():
+    f = File(
+        id="test-file",
+        tenant_id="test-tenant-id",
+        type=FileType.IMAGE,
+        transfer_method=FileTransferMethod.REMOTE_URL,
+        remote_url="https://example.com/image.png",
+        filename="image.png",
+        extension=".png",
+        mime_type="image/png",
+        storage_key="",
+    )
+    with patch.object(file_manager.ssrf_proxy, "stream") as mock_stream:
+        response = mock_stream.return_value.__enter__.return_value
+        response.iter_bytes.side_effect = lambda chunk_size: iter([b"foo", b"bar"])
+
+        assert list(file_manager.download_iter(f, chunk_size=3)) == [b"foo", b"bar"]
+        assert file_manager.download(f) == b"foobar"
+
+    mock_stream.assert_called_with("GET", "https://example.com/image.png", follow_redirects=True)
+    response.iter_bytes.assert_any_call(3)
+
+
+def test_to_urls_batch_keeps_input_order():
+    remote_file = File(
+        id="remote-file",
+        tenant_id="test-tenant-id",
+        type=FileType.IMAGE,
+        transfer_method=FileTransferMethod.REMOTE_URL,
+        remote_url="https://example.com/remote.png",
+        filename="remote.png",
+        extension=".png",
+        mime_type="image/png",
+        storage_key="",
+    )
+    local_file = File(
+        id="local-file",
+        tenant_id="test-tenant-id",
+        type=FileType.IMAGE,
+        transfer_method=FileTransferMethod.LOCAL_FILE,
+        related_id="upload-file-id",
+        filename="local.png",
+        extension=".png",
+        mime_type="image/png",
+        storage_key="",
+    )
+    with (
+        patch.object(file_manager, "sign_tool_files", return_value=["tool-url"]) as mock_sign_tool_files,
+        patch.object(file_manager.helpers, "get_signed_file_urls", return_value=["upload-url"]) as mock_sign_uploads,
+    ):
+        urls = file_manager._to_urls_batch([_tool_file(), remote_file, local_file])
+
+    assert urls == ["tool-url", "https://example.com/remote.png", "upload-url"]
+    mock_sign_tool_files.assert_called_once_with([("test-related-id", ".png")])
+    mock_sign_uploads.assert_called_once_with(["upload-file-id"])
+
+
+def test_to_urls_batch_signs_only_uncached_files():
+    f = _tool_file()
+    other = f.model_copy(update={"related_id": "other-related-id"})
+
+    def sign_tool_files(tool_files):
+        return [f"url-{tool_file_id}" for tool_file_id, _ in tool_files]
+
+    with (
+        patch.object(file_manager, "sign_tool_files", side_effect=sign_tool_files) as mock_sign,
+        patch.object(file_manager, "_signed_url_time_bucket", return_value=1),
+    ):
+        file_manager._to_url(f)
+        urls = file_manager._to_urls_batch([f, other, f, other])
+
+    assert urls == ["url-test-related-id", "url-other-related-id", "url-test-related-id", "url-other-related-id"]
+    assert mock_sign.call_count == 2
+    mock_sign.assert_called_with([("other-related-id", ".png")])
+
+
+def test_get_signed_file_urls_are_verifiable():
+    urls = helpers.get_signed_file_urls(["file-1", "file-2"])
+
+    assert len(urls) == 2
+    for upload_file_id, url in zip(["file-1", "file-2"], urls):
+        query = {key: value[0] for key, value in parse_qs(urlparse(url).query).items()}
+        assert f"/files/{upload_file_id}/file-preview" in url
+        assert helpers.verify_file_signature(upload_file_id=upload_file_id, **query)
+
+
+def test_sign_tool_files_are_verifiable():
+    urls = signature.sign_tool_files([("tool-file-1", ".png"), ("tool-file-2", ".pdf")])
+
+    assert len(urls) == 2
+    for (tool_file_id, extension), url in zip([("tool-file-1", ".png"), ("tool-file-2", ".pdf")], urls):
+        query = {key: value[0] for key, value in parse_qs(urlparse(url).query).items()}
+        assert f"/files/tools/{tool_file_id}{extension}?" in url
+        assert signature.verify_tool_file_signature(file_id=tool_file_id, **query)
@@ -3,7 +3,7 @@ from unittest.mock import MagicMock, patch
 
 import pytest
 
-from core.helper.ssrf_proxy import SSRF_DEFAULT_MAX_RETRIES, STATUS_FORCELIST, make_request
+from core.helper.ssrf_proxy import SSRF_DEFAULT_MAX_RETRIES, STATUS_FORCELIST, make_request, stream
 
 
 @patch("httpx.Client.request")
@@ -50,3 +50,18 @@ def test_retry_logic_success(mock_request):
     assert response.status_code == 200
     assert mock_request.call_count == SSRF_DEFAULT_MAX_RETRIES + 1
     assert mock_request.call_args_list[0][1].get("method") == "GET"
+
+
+@patch("httpx.Client.stream")
+def test_stream_retry_logic_success(mock_stream):
+    mock_response_500 = MagicMock()
+    mock_response_500.status_code = 500
+    mock_response_200 = MagicMock()
+    mock_response_200.status_code = 200
+    mock_stream.return_value.__enter__.side_effect = [mock_response_500, mock_response_200]
+
+    with stream("GET", "http://example.com", max_retries=1) as response:
+        assert response is mock_response_200
+
+    assert mock_stream.call_count == 2
+    assert mock_stream.call_args_list[0][1].get("method") == "GET"
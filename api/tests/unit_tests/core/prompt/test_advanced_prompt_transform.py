@@ -142,10 +142,10 @@ def test__get_chat_model_prompt_messages_with_files_no_memory(get_chat_model_arg
 
     prompt_transform = AdvancedPromptTransform()
     prompt_transform._calculate_rest_token = MagicMock(return_value=2000)
-    with patch("core.file.file_manager.to_prompt_message_content") as mock_get_encoded_string:
-        mock_get_encoded_string.return_value = ImagePromptMessageContent(
-            url=str(files[0].remote_url), format="jpg", mime_type="image/jpg"
-        )
+    with patch("core.file.file_manager.to_prompt_message_contents") as mock_get_encoded_string:
+        mock_get_encoded_string.return_value = [
+            ImagePromptMessageContent(url=str(files[0].remote_url), format="jpg", mime_type="image/jpg")
+        ]
         prompt_messages = prompt_transform._get_chat_model_prompt_messages(
             prompt_template=messages,
             inputs=inputs,
@@ -178,6 +178,18 @@ def test_build_without_type_specification(mock_upload_file):
     assert file.type == FileType.IMAGE
 
 
+def test_build_infers_type_from_uppercase_extension(mock_upload_file):
+    """Test that file type inference ignores the case of the extension"""
+    mock_upload_file.return_value.extension = "JPG"
+    mock_upload_file.return_value.mime_type = "application/octet-stream"
+    mapping = {
+        "transfer_method": "local_file",
+        "upload_file_id": TEST_UPLOAD_FILE_ID,
+    }
+    file = build_from_mapping(mapping=mapping, tenant_id=TEST_TENANT_ID)
+    assert file.type == FileType.IMAGE
+
+
 @pytest.mark.parametrize(
     ("file_type", "should_pass", "expected_error"),
     [